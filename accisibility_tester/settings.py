@@ -127,4 +127,30 @@ LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Number of scans that run at the same time in one process, each of them holds a browser
+SCAN_MAX_WORKERS = 2
+# If True, web processes only queue scans and "manage.py scan_worker" runs them, so selenium is never loaded in
+# the web processes
+SCAN_WORKER_PROCESS = False
+# Seconds after which a running scan whose worker process sent no sign of life is queued again, longer than the
+# slowest phase of a scan
+SCAN_STALE_TIMEOUT = 15 * 60
+# Seconds between two heartbeats of a scan running in a worker process, well below SCAN_STALE_TIMEOUT
+SCAN_HEARTBEAT_INTERVAL = 30
+# Seconds between progress updates sent to clients watching a scan
+SCAN_PROGRESS_INTERVAL = .5
+# Only this many elements of a page are checked, so huge pages can't use unbounded memory. None disables the limit
+SCAN_MAX_NODES = 200_000
+# Texts with the same style share one contrast result. If set, the styles of similar elements (like the cells of a
+# table) are only evaluated for this many of them, the others get the same style if those agree, which makes the
+# counts an estimate on very large pages. Also only this many texts of a style are reported individually. None
+# evaluates and reports all of them
+SCAN_CONTRAST_SAMPLES = None
+# Share of scans that run under a profiler, from 0 to 1. Staff users can also enable it for a single scan. Only one
+# profiled scan runs at a time. Since Python 3.12 the profile also includes the other scans running at the same time,
+# set SCAN_MAX_WORKERS to 1 for profiles of single scans
+SCAN_PROFILE_SAMPLE_RATE = 0
+# Full page screenshots are cut off after this many css pixels, so very long pages don't produce huge images
+SCAN_SCREENSHOT_MAX_HEIGHT = 10000
@@ -1,30 +1,78 @@
 """This module includes the accessibility tester and all its functionality"""
-from typing import TypedDict
+from collections import Counter, defaultdict
+from typing import Callable
 
-from bs4 import BeautifulSoup, Comment, Doctype
 from selenium import webdriver
 from selenium.common.exceptions import MoveTargetOutOfBoundsException, NoSuchElementException
 from selenium.webdriver import ActionChains
-from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 
-SCORE_MULTIPLIERS = {
-    "doc_language": .9,
-    "alt_texts": .9,
-    "input_labels": .9,
-    "empty_buttons": .9,
-    "empty_links": .9,
-    "color_contrast": .3,
-}
+from .page_nodes import FRAME_DOCUMENT, RESOLVE_PATH_JS, NodeTable, capture_node_table
+from .scoring import CounterDict, calculate_result
+
+# checks whose result depends on the rendered layout and not only on the DOM
+LAYOUT_CHECKS = ("alt_texts", "color_contrast")
 
-class CounterDict(TypedDict):
-    doc_language: int
-    alt_texts: int
-    input_labels: int
-    empty_buttons: int
-    empty_links: int
-    color_contrast: int
+# returns the element of a path, shadow roots are resolved too
+RESOLVE_PATH_SCRIPT = RESOLVE_PATH_JS + "return resolvePath(arguments[0]);"
+# scrolls to the element of a path and returns if it is displayed, null if the element does not exist
+ELEMENT_DISPLAYED_SCRIPT = RESOLVE_PATH_JS + """
+const element = resolvePath(arguments[0]);
+if (element === null) {
+    return null;
+}
+element.scrollIntoView({block: "center"});
+const style = element.ownerDocument.defaultView.getComputedStyle(element);
+const rect = element.getBoundingClientRect();
+return style.display !== "none" && style.visibility !== "hidden" && rect.width > 0 && rect.height > 0;
+"""
+
+# number of elements whose styles are collected with one script call
+STYLE_BATCH_SIZE = 2000
+# returns the computed styles the contrast of elements depends on, the argument are the paths of the elements. Every
+# distinct style is returned once in signatures, assignments holds the index of the style of every element or -1 for
+# elements that were not found or are not displayed
+TEXT_STYLES_SCRIPT = RESOLVE_PATH_JS + """
+const paths = arguments[0];
+const getStyle = (element) => element.ownerDocument.defaultView.getComputedStyle(element);
+// the element behind an element, leaving shadow roots to their host and iframe documents to their iframe
+const getBehind = (element) => element.parentElement || element.getRootNode().host || element.ownerDocument.defaultView.frameElement;
+
+const backgrounds = new Map();
+function getBackground(element) {
+    if (element === null) {
+        return "rgba(255,255,255,1)";
+    }
+    if (!backgrounds.has(element)) {
+        const color = getStyle(element).backgroundColor;
+        const transparent = color === "transparent" || /^rgba\\(.*,\\s*0\\)$/.test(color);
+        backgrounds.set(element, transparent ? getBackground(getBehind(element)) : color);
+    }
+    return backgrounds.get(element);
+}
 
+const signatures = [];
+const indexes = new Map();
+const assignments = paths.map((path) => {
+    const element = resolvePath(path);
+    // only elements have a style, not the documents of iframes or shadow roots
+    if (element === null || element.nodeType !== Node.ELEMENT_NODE) {
+        return -1;
+    }
+    const style = getStyle(element);
+    if (style.display === "none") {
+        return -1;
+    }
+    const signature = [style.color, getBackground(element), style.fontSize, style.fontWeight, element.localName === "strong"];
+    const key = signature.join("|");
+    if (!indexes.has(key)) {
+        indexes.set(key, signatures.length);
+        signatures.push(signature);
+    }
+    return indexes.get(key);
+});
+return {signatures: signatures, assignments: assignments};
+"""
 
 class AccessibilityTester:
     """
@@ -38,13 +86,28 @@ class AccessibilityTester:
         The height of the browser window
     browser_width : int
         The width of the browser window
+    progress_callback : Callable[[str, CounterDict, CounterDict], None] | None
+        Called with the name of the phase that is about to run and the counters collected so far
+    max_nodes : int | None
+        Only the first max_nodes elements of the page are checked, None means no limit
+    contrast_samples : int | None
+        Elements with the same style share one contrast result. If set, the styles of similar elements are only
+        evaluated for this many of them as long as those agree, and only this many are reported individually. None
+        evaluates and reports all of them
     """
-    def __init__(self, url: str, browser_height: int = 720, browser_width: int = 1280):
+    def __init__(
+            self, url: str, browser_height: int = 720, browser_width: int = 1280,
+            progress_callback: Callable[[str, CounterDict, CounterDict], None] | None = None,
+            max_nodes: int | None = None, contrast_samples: int | None = None,
+    ):
         self.url = url
         self.browser_height = browser_height
         self.browser_width = browser_width
+        self.progress_callback = progress_callback
+        self.max_nodes = max_nodes
+        self.contrast_samples = contrast_samples
         self.driver = None
-        self.page = None
+        self.page: NodeTable | None = None
         self.correct: CounterDict = {
             "doc_language": 0,
             "alt_texts": 0,
@@ -64,32 +127,49 @@ class AccessibilityTester:
 
         self.visited_links = []
 
-    def start_driver(self):
-        options = FirefoxOptions()
-        options.headless = True
-        options.add_argument("--headless")
-        options.add_argument("--log-level=3")
-
-        self.driver = webdriver.Firefox(options=options)
+    def start_driver(self, driver: webdriver.Firefox | None = None):
+        """This function opens the page in a new browser or, if one is given, in an already running browser"""
+        self.driver = create_driver() if driver is None else driver
 
         self.driver.set_window_size(self.browser_width, self.browser_height)
         self.driver.get(self.url)
-        self.page = BeautifulSoup(self.driver.page_source, "html.parser")
 
     def test_page(self):
         """This function executes the tests for the current page. If tests for subpages are enabled, it will also test all subpages"""
-        self.page = BeautifulSoup(self.driver.page_source, "html.parser")
-        self.check_doc_language()
-        self.check_alt_texts()
-        self.check_input_labels()
-        self.check_buttons()
-        self.check_links()
-        self.check_color_contrast()
+        self.page = capture_node_table(self.driver, self.max_nodes)
+        if self.page.truncated:
+            print(f"x Page has more than {self.max_nodes} elements, only the first ones are checked")
+        for check in (
+                self.check_doc_language, self.check_alt_texts, self.check_input_labels, self.check_buttons,
+                self.check_links, self.check_color_contrast,
+        ):
+            self.report_progress(check.__name__)
+            check()
+
+    def report_progress(self, phase: str):
+        """This function passes the current phase and counters to the progress callback, if one is set"""
+        if self.progress_callback is not None:
+            self.progress_callback(phase, self.correct, self.wrong)
+
+    def test_viewport(self, browser_width: int, browser_height: int):
+        """This function resizes the already loaded page and re-runs only the layout dependent checks, results of
+        DOM-only checks are kept from the previous run"""
+        self.browser_width = browser_width
+        self.browser_height = browser_height
+        self.driver.set_window_size(browser_width, browser_height)
+        for key in LAYOUT_CHECKS:
+            self.correct[key] = 0
+            self.wrong[key] = 0
+
+        for check in (self.check_alt_texts, self.check_color_contrast):
+            self.report_progress(check.__name__)
+            check()
 
     def check_doc_language(self):
         """This function checks if the doc language is set (3.1.1 H57)"""
         # check if language attribute exists and is not empty
-        lang_attr = self.page.find("html").get_attribute_list("lang")[0]
+        html_element = self.page.find("html")
+        lang_attr = None if html_element is None else self.page.get_attrs(html_element).get("lang")
         if not lang_attr is None and not lang_attr == "":
             print("  Document language is set")
             self.correct["doc_language"] += 1
@@ -101,14 +181,24 @@ class AccessibilityTester:
             self.wrong["doc_language"] += 1
 
     def error_if_visible(self, xpath: str, text: str) -> bool:
-        try:
-            el = self.driver.find_element(By.XPATH, xpath)
-            ActionChains(self.driver).move_to_element(el).perform()
-        except (MoveTargetOutOfBoundsException, NoSuchElementException):
-            print(f"  {text}, but element is not visible", xpath)
-            return False
-
-        if el.is_displayed():
+        if FRAME_DOCUMENT in xpath:
+            # elements of iframes can't be used from the top level browsing context, so they are checked by a script
+            displayed = self.driver.execute_script(ELEMENT_DISPLAYED_SCRIPT, xpath)
+            if displayed is None:
+                print(f"  {text}, but element is not visible", xpath)
+                return False
+        else:
+            try:
+                el = self.driver.execute_script(RESOLVE_PATH_SCRIPT, xpath)
+                if el is None:
+                    raise NoSuchElementException(xpath)
+                ActionChains(self.driver).move_to_element(el).perform()
+            except (MoveTargetOutOfBoundsException, NoSuchElementException):
+                print(f"  {text}, but element is not visible", xpath)
+                return False
+            displayed = el.is_displayed()
+
+        if displayed:
             print(f"x {text}", xpath)
             return False
 
@@ -116,253 +206,198 @@ class AccessibilityTester:
 
     def check_alt_texts(self):
         """This function checks if all images on the page have an alternative text (1.1.1 H37)"""
+        page = self.page
         # get all img elements
-        img_elements = self.page.find_all("img")
-        for img_element in img_elements:
+        for img_element in page.find_all("img"):
             # check if img element has an alternative text that is not empty
-            alt_text = img_element.get_attribute_list('alt')
-            if not alt_text:
-                el_xpath = xpath_soup(img_element)
-                if not self.error_if_visible(el_xpath, "Alt text is missing"):
-                    self.wrong["alt_texts"] += 1
-                continue
-
-            alt_text = alt_text[0]
+            alt_text = page.get_attrs(img_element).get("alt")
             if not alt_text is None and not alt_text == "":
-                print("  Alt text is correct", xpath_soup(img_element))
+                print("  Alt text is correct", page.xpath(img_element))
                 self.correct["alt_texts"] += 1
             elif not alt_text is None:
-                el_xpath = xpath_soup(img_element)
-                if not self.error_if_visible(el_xpath, "Alt text is empty"):
+                if not self.error_if_visible(page.xpath(img_element), "Alt text is empty"):
                     self.wrong["alt_texts"] += 1
             else:
-                el_xpath = xpath_soup(img_element)
-                if not self.error_if_visible(el_xpath, "Alt text is missing"):
+                if not self.error_if_visible(page.xpath(img_element), "Alt text is missing"):
                     self.wrong["alt_texts"] += 1
 
     def check_input_labels(self):
         """This function checks if all input elements on the page have some form of label (1.3.1 H44 & ARIA16)"""
-        # get all input and label elements
-        input_elements = self.page.find_all("input")
-        label_elements = self.page.find_all("label")
-        for input_element in input_elements:
+        page = self.page
+        # ids of the elements that label elements refer to, ids only apply inside of their document or shadow root
+        label_targets = {
+            (page.scopes[label_element], page.get_attrs(label_element).get("for"))
+            for label_element in page.find_all("label")
+        }
+        for input_element in page.find_all("input"):
+            attrs = page.get_attrs(input_element)
             # exclude input element of type hidden, submit, reset and button
-            if ("type" in input_element.attrs and not input_element['type'] == "hidden" and not input_element['type'] == "submit" \
-                    and not input_element['type'] == "reset" and not input_element['type'] == "button") or "type" not in input_element.attrs:
-                # check if input is of type image and has a alt text that is not empty
-                if "type" in input_element.attrs and input_element['type'] == "image" and "alt" in input_element.attrs \
-                        and not input_element['alt'] == "":
-                    print("  Input of type image labelled with alt text", xpath_soup(input_element))
-                    self.correct["input_labels"] += 1
-                # check if input element uses aria-label
-                elif "aria-label" in input_element.attrs and not input_element['aria-label'] == "":
-                    print("  Input labelled with aria-label attribute", xpath_soup(input_element))
+            if attrs.get("type") in ("hidden", "submit", "reset", "button"):
+                continue
+
+            # check if input is of type image and has a alt text that is not empty
+            if attrs.get("type") == "image" and attrs.get("alt", "") != "":
+                print("  Input of type image labelled with alt text", page.xpath(input_element))
+                self.correct["input_labels"] += 1
+            # check if input element uses aria-label
+            elif attrs.get("aria-label", "") != "":
+                print("  Input labelled with aria-label attribute", page.xpath(input_element))
+                self.correct["input_labels"] += 1
+            # check if input element uses aria-labelledby
+            elif attrs.get("aria-labelledby", "") != "":
+                label_element = page.ids.get((page.scopes[input_element], attrs["aria-labelledby"]))
+                if label_element is None:
+                    print("x Input labelled with aria-labelledby attribute, but related label does not exist", page.xpath(input_element))
+                    self.wrong["input_labels"] += 1
+                elif page.has_strings[label_element]:
+                    print("  Input labelled with aria-labelledby attribute", page.xpath(input_element))
                     self.correct["input_labels"] += 1
-                # check if input element uses aria-labelledby
-                elif "aria-labelledby" in input_element.attrs and not input_element['aria-labelledby'] == "":
-                    label_element = self.page.find(id=input_element['aria-labelledby'])
-                    if not label_element is None:
-                        texts_in_label_element = label_element.findAll(text=True)
-                        if not texts_in_label_element == []:
-                            print("  Input labelled with aria-labelledby attribute", xpath_soup(input_element))
-                            self.correct["input_labels"] += 1
-                        else:
-                            print("x Input labelled with aria-labelledby attribute, but related label has no text", xpath_soup(input_element))
-                            self.wrong["input_labels"] += 1
-                    else:
-                        print("x Input labelled with aria-labelledby attribute, but related label does not exist", xpath_soup(input_element))
-                        self.wrong["input_labels"] += 1
                 else:
-                    # check if input element has a corresponding label element
-                    label_correct = False
-                    for label_element in label_elements:
-                        # check if "for" attribute of label element is identical to "id" of input element
-                        if "for" in label_element.attrs and "id" in input_element.attrs and label_element['for'] == input_element['id']:
-                            label_correct = True
-                    if label_correct:
-                        print("  Input labelled with label element", xpath_soup(input_element))
-                        self.correct["input_labels"] += 1
-                    else:
-                        print("x Input not labelled at all", xpath_soup(input_element))
-                        self.wrong["input_labels"] += 1
+                    print("x Input labelled with aria-labelledby attribute, but related label has no text", page.xpath(input_element))
+                    self.wrong["input_labels"] += 1
+            # check if input element has a corresponding label element
+            elif "id" in attrs and (page.scopes[input_element], attrs["id"]) in label_targets:
+                print("  Input labelled with label element", page.xpath(input_element))
+                self.correct["input_labels"] += 1
+            else:
+                print("x Input not labelled at all", page.xpath(input_element))
+                self.wrong["input_labels"] += 1
 
     def check_buttons(self):
         """This function checks if all buttons and input elements of the types submit, button and reset have some form of content (1.1.1 & 2.4.4)"""
-        # get all buttons and input elements of the types submit, button and reset
-        input_elements = self.page.find_all("input", type=["submit", "button", "reset"])
-        button_elements = self.page.find_all("button")
-
-        for input_element in input_elements:
-            # check if input element has a value attribute that is not empty
-            if "value" in input_element.attrs and not input_element['value'] == "":
-                print("  Button has content", xpath_soup(input_element))
-                self.correct["empty_buttons"] += 1
+        page = self.page
+        for element in page.find_all("input", "button"):
+            attrs = page.get_attrs(element)
+            if page.tags[element] == "input":
+                # only input elements of the types submit, button and reset are buttons
+                if attrs.get("type") not in ("submit", "button", "reset"):
+                    continue
+                # check if input element has a value attribute that is not empty
+                has_content = attrs.get("value", "") != ""
             else:
-                print("x Button is empty", xpath_soup(input_element))
-                self.wrong["empty_buttons"] += 1
+                # check if the button has content or a title
+                has_content = page.has_strings[element] or attrs.get("title", "") != ""
 
-        for button_element in button_elements:
-            # check if the button has content or a title
-            texts = button_element.findAll(text=True)
-            if not texts == [] or ("title" in button_element.attrs and not button_element["title"] == ""):
-                print("  Button has content", xpath_soup(button_element))
+            if has_content:
+                print("  Button has content", page.xpath(element))
                 self.correct["empty_buttons"] += 1
             else:
-                print("x Button is empty", xpath_soup(button_element))
+                print("x Button is empty", page.xpath(element))
                 self.wrong["empty_buttons"] += 1
 
     def check_links(self):
         """This function checks if all links on the page have some form of content (2.4.4 G91 & H30)"""
-        # get all a elements
-        link_elements = self.page.find_all("a")
-        for link_element in link_elements:
+        page = self.page
+        for link_element in page.find_all("a"):
             # check if link has content
-            texts_in_link_element = link_element.findAll(text=True)
-            img_elements = link_element.findChildren("img", recursive=False)
-            all_alt_texts_set = True
-            for img_element in img_elements:
-                alt_text = img_element.get_attribute_list('alt')[0]
-                if alt_text is None or alt_text == "":
-                    all_alt_texts_set = False
-            if not texts_in_link_element == [] or (not img_elements == [] and all_alt_texts_set):
-                print("  Link has content", xpath_soup(link_element))
+            img_elements = page.children(link_element, "img")
+            all_alt_texts_set = all(page.get_attrs(img_element).get("alt", "") != "" for img_element in img_elements)
+            if page.has_strings[link_element] or (img_elements and all_alt_texts_set):
+                print("  Link has content", page.xpath(link_element))
                 self.correct["empty_links"] += 1
             else:
-                print("x Link is empty", xpath_soup(link_element))
+                print("x Link is empty", page.xpath(link_element))
                 self.wrong["empty_links"] += 1
 
     def check_color_contrast(self):
         """This function checks if all texts on the page have high enough contrast to the color of the background (1.4.3 G18 & G145 (& 148))"""
-        # exclude script, style, title and empty elements as well as doctype and comments
-        texts_on_page = extract_texts(self.page)
-        input_elements = self.page.find_all("input")
-        elements_with_text = texts_on_page + input_elements
-        for text in elements_with_text:
-            selenium_element = self.driver.find_element(by="xpath", value=xpath_soup(text))
-            # exclude invisible texts
-            element_visible = selenium_element.value_of_css_property('display')
-            if not element_visible == "none" and (not text.name == "input" or (text.name == "input" \
-                    and "type" in text.attrs and not text['type'] == "hidden")):
-                text_color = convert_to_rgba_value(selenium_element.value_of_css_property('color'))
-                background_color = get_background_color(self.driver, text)
-
-                # calculate contrast between text color and background color
-                contrast = get_contrast_ratio(eval(text_color[4:]), eval(background_color[4:]))
-
-                # get font size and font weight
-                font_size = selenium_element.value_of_css_property('font-size')
-                font_weight = selenium_element.value_of_css_property('font-weight')
-
-                if not font_size is None and font_size.__contains__("px") and \
-                        (int(''.join(filter(str.isdigit, font_size))) >= 18 or ((font_weight == "bold" or font_weight == "700" \
-                        or font_weight == "800" or font_weight == "900" or text.name == "strong") \
-                        and int(''.join(filter(str.isdigit, font_size))) >= 14)):
-                    if contrast >= 3:
-                        print("  Contrast meets minimum requirements", xpath_soup(text), text_color, background_color)
-                        self.correct["color_contrast"] += 1
-                    else:
-                        print("x Contrast does not meet minimum requirements", xpath_soup(text), text_color, background_color)
-                        self.wrong["color_contrast"] += 1
+        page = self.page
+        # texts inside of script, style, title and noscript elements as well as comments are not in the list,
+        # an element is counted once for every text directly inside it
+        occurrences = Counter(page.text_parents)
+        for input_element in page.find_all("input"):
+            if page.get_attrs(input_element).get("type", "hidden") != "hidden":
+                occurrences[input_element] += 1
+
+        for style, (count, members) in self.group_text_styles(occurrences).items():
+            text_color, background_color, font_size, font_weight, strong = style
+            text_color = convert_to_rgba_value(text_color)
+            background_color = convert_to_rgba_value(background_color)
+
+            # calculate contrast between text color and background color once for all elements with this style
+            contrast = get_contrast_ratio(eval(text_color[4:]), eval(background_color[4:]))
+
+            if not font_size is None and font_size.__contains__("px") and \
+                    (int(''.join(filter(str.isdigit, font_size))) >= 18 or ((font_weight == "bold" or font_weight == "700" \
+                    or font_weight == "800" or font_weight == "900" or strong) \
+                    and int(''.join(filter(str.isdigit, font_size))) >= 14)):
+                contrast_ok = contrast >= 3
+            else:
+                contrast_ok = contrast >= 4.5
+
+            if contrast_ok:
+                self.correct["color_contrast"] += count
+            else:
+                self.wrong["color_contrast"] += count
+            message = "  Contrast meets minimum requirements" if contrast_ok else "x Contrast does not meet minimum requirements"
+            for member in members:
+                print(message, page.xpath(member), text_color, background_color)
+            if count > len(members):
+                print(f"{message[:2]}... and {count - len(members)} more texts with the same style", text_color, background_color)
+
+    def group_text_styles(self, occurrences: Counter) -> dict[tuple, tuple[int, list[int]]]:
+        """This function groups visible elements by their color, background color, font size and font weight. The
+        result maps every style to the number of texts with it and the elements with it (at most contrast_samples).
+        With contrast_samples, similar elements (same tag, same parent tag and same grandparent, like the cells of a
+        table or the items of a list) share the style of their first contrast_samples elements if those all have the
+        same style, only otherwise the styles of the other elements are evaluated as well"""
+        page = self.page
+        elements = list(occurrences)
+        if self.contrast_samples is None:
+            styles = self.get_text_styles(elements)
+        else:
+            similar: dict[tuple, list[int]] = defaultdict(list)
+            for element in elements:
+                parent = page.parents[element]
+                grandparent = page.parents[parent] if parent != -1 else -1
+                similar[(grandparent, page.tags[parent] if parent != -1 else "", page.tags[element])].append(element)
+
+            styles = self.get_text_styles([
+                element for members in similar.values() for element in members[:self.contrast_samples]
+            ])
+            remaining = []
+            for members in similar.values():
+                sampled = {styles.get(element) for element in members[:self.contrast_samples]}
+                if len(sampled) == 1 and None not in sampled:
+                    styles.update(dict.fromkeys(members[self.contrast_samples:], sampled.pop()))
                 else:
-                    if contrast >= 4.5:
-                        print("  Contrast meets minimum requirements", xpath_soup(text), text_color, background_color)
-                        self.correct["color_contrast"] += 1
-                    else:
-                        print("x Contrast does not meet minimum requirements", xpath_soup(text), text_color, background_color)
-                        self.wrong["color_contrast"] += 1
-
-    @staticmethod
-    def calculate_result(correct: dict, wrong: dict) -> float:
-        """This function calculates the result of the test and prints it to the console"""
-        # calculate correct and false implementations
-        total: dict = {}
-        for key, count in correct.items():
-            if key not in total:
-                total[key] = 0
-            total[key] += count
-        for key, count in wrong.items():
-            if key not in total:
-                total[key] = 0
-            total[key] += count
-
-        scores = {}
-        for key, total_score in total.items():
-            if not total_score:
+                    remaining.extend(members[self.contrast_samples:])
+            styles.update(self.get_text_styles(remaining))
+
+        groups: dict[tuple, tuple[int, list[int]]] = {}
+        for element in elements:
+            if (style := styles.get(element)) is None:
                 continue
-            scores[key] = correct.get(key, 0) / total_score
-
-        corrected_scores = {}
-        for key, score in scores.items():
-            corrected_scores[key] = score * SCORE_MULTIPLIERS[key]
-
-        corrected_score = sum(scores.values()) / len(scores)
-        corrected_score /= sum(SCORE_MULTIPLIERS.values()) / len(SCORE_MULTIPLIERS)
-        corrected_score = max(1., min(0., corrected_score))
-
-        return corrected_score
-
-
-# src: https://gist.github.com/ergoithz/6cf043e3fdedd1b94fcf
-def xpath_soup(element):
-    # pylint: disable=consider-using-f-string
-    """This function calculates the xpath of an element"""
-    if element is None:
-        return '/html'
-    components = []
-    child = element if element.name else element.parent
-    for parent in child.parents:  # type: bs4.element.Tag
-        siblings = parent.find_all(child.name, recursive=False)
-        components.append(
-            child.name if 1 == len(siblings) else '%s[%d]' % (
-                child.name,
-                next(i for i, s in enumerate(siblings, 1) if s is child)
-                )
-            )
-        child = parent
-    components.reverse()
-    if not components:
-        return '/html'
-    return '/%s' % '/'.join(components)
-
-def extract_texts(soup):
-    """This function extracts all texts from a page"""
-    soup2 = soup
-
-    # remove script, style and title elements
-    for invisible_element in soup2(["script", "style", "title", "noscript"]):
-        invisible_element.extract()
-
-    # remove comments
-    comments = soup2.findAll(text=lambda text:isinstance(text, Comment))
-    for comment in comments:
-        comment.extract()
-
-    # remove doctype
-    doctype = soup2.find(text=lambda text:isinstance(text, Doctype))
-    if not doctype is None:
-        doctype.extract()
-
-    # get all elements with text
-    texts = []
-    texts_on_page = soup2.findAll(text=True)
-    for text in texts_on_page:
-        if not text.strip() == "" and not text == "\n":
-            texts.append(text.parent)
-
-    return texts
-
-def get_background_color(driver, text):
-    """This function returns the background color of a given text"""
-    if text is None:
-        return "rgba(255,255,255,1)"
-
-    selenium_element = driver.find_element(by="xpath", value=xpath_soup(text))
-    background_color = convert_to_rgba_value(selenium_element.value_of_css_property('background-color'))
-
-    if eval(background_color[4:])[3] == 0:
-        return get_background_color(driver, text.parent)
-
-    return background_color
+            count, members = groups.get(style, (0, []))
+            if self.contrast_samples is None or len(members) < self.contrast_samples:
+                members.append(element)
+            groups[style] = (count + occurrences[element], members)
+        return groups
+
+    def get_text_styles(self, elements: list[int]) -> dict[int, tuple]:
+        """This function returns the style of every given element that is displayed, in batches of STYLE_BATCH_SIZE
+        elements per script call. Elements with the same style share one tuple"""
+        styles = {}
+        for start in range(0, len(elements), STYLE_BATCH_SIZE):
+            batch = elements[start:start + STYLE_BATCH_SIZE]
+            result = self.driver.execute_script(TEXT_STYLES_SCRIPT, [self.page.xpath(element) for element in batch])
+            signatures = [tuple(signature) for signature in result["signatures"]]
+            for element, index in zip(batch, result["assignments"]):
+                if index != -1:
+                    styles[element] = signatures[index]
+        return styles
+
+    calculate_result = staticmethod(calculate_result)
+
+
+def create_driver() -> webdriver.Firefox:
+    """This function starts a headless browser"""
+    options = FirefoxOptions()
+    options.headless = True
+    options.add_argument("--headless")
+    options.add_argument("--log-level=3")
+
+    return webdriver.Firefox(options=options)
 
 def convert_to_rgba_value(color):
     """This function converts a color value to the rgba format"""
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils.html import format_html
 
-from .models import WebsiteScan, Violation
+from .models import ViewportResult, WebsiteScan, Violation
 
 
 class ViolationInline(admin.TabularInline):
@@ -8,7 +9,26 @@ class ViolationInline(admin.TabularInline):
     extra = 0
 
 
+class ViewportResultInline(admin.TabularInline):
+    model = ViewportResult
+    extra = 0
+
+
 @admin.register(WebsiteScan)
 class ScanAdmin(admin.ModelAdmin):
-    list_display = ('url', 'timestamp')
-    inlines = [ViolationInline]
+    list_display = ('url', 'timestamp', 'status')
+    readonly_fields = ('profile_download', 'profile_summary_display')
+    exclude = ('profile', 'profile_summary')
+    inlines = [ViewportResultInline, ViolationInline]
+
+    @admin.display(description="Profile")
+    def profile_download(self, obj):
+        if not obj.profile:
+            return "-"
+        return format_html('<a href="{}" download>Download profile</a> (open with python -m pstats)', obj.profile.url)
+
+    @admin.display(description="Slowest functions")
+    def profile_summary_display(self, obj):
+        if not obj.profile_summary:
+            return "-"
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.profile_summary)
@@ -2,9 +2,26 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .scoring import VIEWPORTS
+
 
 class URLForm(forms.Form):
     url = forms.URLField(label="Website URL", widget=forms.URLInput(attrs={"class": "form-control"}))
+    viewports = forms.MultipleChoiceField(
+        label="Viewports",
+        choices=[(name, f"{name.capitalize()} ({width}x{height})") for name, (width, height) in VIEWPORTS.items()],
+        initial=["desktop"],
+        widget=forms.CheckboxSelectMultiple,
+    )
+    full_page = forms.BooleanField(label="Screenshot of the whole page", required=False)
+
+    # only shown to and used for staff users
+    profile = forms.BooleanField(label="Profile this scan", required=False)
+
+    def clean_viewports(self):
+        # keep the order of VIEWPORTS regardless of the order the browser submitted them in
+        selected = self.cleaned_data["viewports"]
+        return [name for name in VIEWPORTS if name in selected]
 
 
 class RegisterForm(UserCreationForm):
@@ -0,0 +1,227 @@
+"""Scans a list of urls from sitemaps or text files with several browsers in parallel"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urljoin
+from urllib.request import urlopen
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, transaction
+
+from analyzer.accessibility_tester import create_driver
+from analyzer.models import WebsiteScan
+from analyzer.scanner import perform_scan, save_results
+from analyzer.scoring import VIEWPORTS
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def read_sitemap(source: str) -> list[str]:
+    """Returns the page urls of a sitemap, sitemap indexes are followed recursively"""
+    urls = []
+    nested = []
+    with (urlopen(source) if "://" in source else open(source, "rb")) as file:
+        for _, element in ElementTree.iterparse(file):
+            if element.tag in (f"{SITEMAP_NS}url", "url"):
+                loc = element.findtext(f"{SITEMAP_NS}loc") or element.findtext("loc")
+                if loc:
+                    urls.append(loc.strip())
+                element.clear()
+            elif element.tag in (f"{SITEMAP_NS}sitemap", "sitemap"):
+                loc = element.findtext(f"{SITEMAP_NS}loc") or element.findtext("loc")
+                if loc:
+                    nested.append(loc.strip())
+                element.clear()
+
+    for sitemap in nested:
+        if "://" in source:
+            sitemap = urljoin(source, sitemap)
+        elif "://" not in sitemap:
+            sitemap = str(Path(source).parent / sitemap)
+        urls.extend(read_sitemap(sitemap))
+    return urls
+
+
+def read_url_file(source: str) -> list[str]:
+    """Returns the urls of a text file with one url per line, empty lines and lines starting with # are skipped"""
+    with open(source, encoding="utf8") as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+
+
+def read_sources(sources: list[str]) -> list[str]:
+    urls = []
+    for source in sources:
+        if source.endswith(".xml") or "://" in source:
+            urls.extend(read_sitemap(source))
+        else:
+            urls.extend(read_url_file(source))
+    # remove duplicates, but keep the order
+    return list(dict.fromkeys(urls))
+
+
+class Checkpoint:
+    """Urls that were already scanned or failed, stored in a json file so an interrupted run can be resumed"""
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: set[str] = set()
+        self.failed: dict[str, str] = {}
+        if path.exists():
+            # failed urls are not skipped, they are tried again when the run is resumed
+            self.done = set(json.loads(path.read_text())["done"])
+
+    def save(self):
+        # write to a temporary file first, so an interruption never leaves a broken checkpoint
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps({"done": sorted(self.done), "failed": self.failed}))
+        os.replace(tmp_path, self.path)
+
+
+class Command(BaseCommand):
+    help = "Scans all urls from sitemaps or url files, interrupted runs continue from the last checkpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="+", help="Sitemap files or urls (.xml) or text files with one url per line")
+        parser.add_argument("--user", required=True, help="Username the scans are stored for")
+        parser.add_argument("--workers", type=int, default=4, help="Number of browsers running in parallel")
+        parser.add_argument("--batch-size", type=int, default=20, help="Number of scans stored in one transaction")
+        parser.add_argument("--retries", type=int, default=2, help="How often a failed url is retried")
+        parser.add_argument("--backoff", type=float, default=5., help="Seconds to wait before the first retry, doubled for every further retry")
+        parser.add_argument(
+            "--viewports", default="desktop",
+            help=f"Comma separated viewports, available are: {', '.join(VIEWPORTS)}",
+        )
+        parser.add_argument("--full-page", action="store_true", help="Take screenshots of the whole page")
+        parser.add_argument("--checkpoint", help="Checkpoint file, defaults to the first source with .checkpoint.json appended")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        viewports = options["viewports"].split(",")
+        if unknown := [name for name in viewports if name not in VIEWPORTS]:
+            raise CommandError(f"Unknown viewports: {', '.join(unknown)}")
+
+        self.retries = options["retries"]
+        self.backoff = options["backoff"]
+        self.viewports = viewports
+        self.full_page = options["full_page"]
+        self.local = threading.local()
+        self.drivers = []
+        self.drivers_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        checkpoint = Checkpoint(Path(options["checkpoint"] or f"{options['sources'][0].rsplit('/', 1)[-1]}.checkpoint.json"))
+        urls = [url for url in read_sources(options["sources"]) if url not in checkpoint.done]
+        self.stdout.write(f"{len(urls)} urls to scan, {len(checkpoint.done)} already scanned")
+
+        batch = []
+        scanned = 0
+        started_at = time.monotonic()
+        workers = options["workers"]
+        url_iter = iter(urls)
+        running = set()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+        try:
+            # only a few urls are queued at a time, so results never pile up in memory
+            for url in url_iter:
+                running.add(executor.submit(self.scan_url, url))
+                if len(running) >= workers * 2:
+                    break
+
+            while running:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    url, result, error = future.result()
+                    if error is None:
+                        batch.append((url, result))
+                    else:
+                        checkpoint.failed[url] = error
+                    scanned += 1
+                    next_url = next(url_iter, None)
+                    if next_url is not None:
+                        running.add(executor.submit(self.scan_url, next_url))
+
+                if len(batch) >= options["batch_size"] or not running:
+                    self.store_batch(user, batch, checkpoint)
+                    batch = []
+
+                elapsed = time.monotonic() - started_at
+                rate = scanned / elapsed
+                eta = timedelta(seconds=int((len(urls) - scanned) / rate)) if rate else "unknown"
+                self.stdout.write(f"{scanned}/{len(urls)} scanned, {rate * 60:.1f} urls/min, ETA {eta}")
+        except KeyboardInterrupt:
+            # queued scans are dropped instead of waited for, their results could not be stored anymore
+            self.stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.store_batch(user, batch, checkpoint)
+            self.stdout.write(self.style.WARNING("Interrupted, run the same command again to continue"))
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # quitting the browsers also ends scans that are still running
+            with self.drivers_lock:
+                drivers = list(self.drivers)
+            for driver in drivers:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+        if checkpoint.failed:
+            self.stdout.write(self.style.ERROR(f"{len(checkpoint.failed)} urls failed:"))
+            for url, error in checkpoint.failed.items():
+                self.stdout.write(f"  {url}: {error}")
+        self.stdout.write(self.style.SUCCESS(f"Scanned {scanned - len(checkpoint.failed)} urls"))
+
+    def get_driver(self):
+        """Every worker thread keeps its own browser for all urls it scans"""
+        if getattr(self.local, "driver", None) is None:
+            self.local.driver = create_driver()
+            with self.drivers_lock:
+                self.drivers.append(self.local.driver)
+        return self.local.driver
+
+    def discard_driver(self):
+        """The browser of the current thread is closed after a failure, the next scan starts a new one"""
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            # starting the browser failed, there is nothing to close
+            return
+        self.local.driver = None
+        with self.drivers_lock:
+            self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def scan_url(self, url: str) -> tuple[str, tuple | None, str | None]:
+        """Scans a url, failures are retried with exponential backoff. Returns the url, the results and the error"""
+        for attempt in range(self.retries + 1):
+            # no new browser is started once the run was interrupted, it would never be closed
+            if self.stopped.is_set():
+                return url, None, "interrupted"
+            try:
+                return url, perform_scan(url, self.viewports, driver=self.get_driver(), full_page=self.full_page), None
+            except Exception as e:
+                self.discard_driver()
+                if attempt == self.retries:
+                    return url, None, f"{type(e).__name__}: {e}"
+                if self.stopped.wait(self.backoff * 2 ** attempt):
+                    return url, None, "interrupted"
+
+    def store_batch(self, user: User, batch: list[tuple[str, tuple]], checkpoint: Checkpoint):
+        with transaction.atomic():
+            for url, (viewport_results, results) in batch:
+                save_results(WebsiteScan(url=url, user=user, full_page_requested=self.full_page), viewport_results, results)
+        checkpoint.done.update(url for url, _ in batch)
+        checkpoint.save()
+        close_old_connections()
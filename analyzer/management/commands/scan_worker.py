@@ -0,0 +1,76 @@
+"""Runs the scans queued by the web processes when SCAN_WORKER_PROCESS is enabled"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from analyzer.scanner import claim_pending_scan, requeue_stale_scans, run_scan
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Runs pending scans, web processes only queue scans if SCAN_WORKER_PROCESS is enabled"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=settings.SCAN_MAX_WORKERS, help="Number of scans running in parallel",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=2., help="Seconds to wait before looking for new scans again",
+        )
+
+    def handle(self, *args, **options):
+        # import the scanning stack up front, so the first scan doesn't pay for it
+        import analyzer.accessibility_tester  # noqa: F401
+
+        self.poll_interval = options["poll_interval"]
+        self.stopped = threading.Event()
+        self.stdout.write(f"Waiting for scans with {options['workers']} workers")
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="scan") as executor:
+            for _ in range(options["workers"]):
+                executor.submit(self.work)
+            try:
+                while not self.stopped.wait(self.poll_interval):
+                    self.requeue_stale_scans()
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping after the running scans")
+                self.stopped.set()
+
+    def requeue_stale_scans(self):
+        try:
+            if count := requeue_stale_scans():
+                self.stdout.write(f"Queued {count} scans of stopped workers again")
+        except Exception:
+            log.exception("Queueing stale scans failed")
+        finally:
+            close_old_connections()
+
+    def work(self):
+        while not self.stopped.is_set():
+            # errors, like a locked database, must not end the thread, or the worker silently runs fewer scans
+            try:
+                self.run_next_scan()
+            except Exception:
+                log.exception("Scan worker failed, trying again")
+                close_old_connections()
+                self.stopped.wait(self.poll_interval)
+
+    def run_next_scan(self):
+        scan = claim_pending_scan()
+        if scan is None:
+            close_old_connections()
+            self.stopped.wait(self.poll_interval)
+            return
+
+        started_at = time.monotonic()
+        self.stdout.write(f"Scanning {scan.url} (scan #{scan.id})")
+        run_scan(
+            scan.id, scan.url, scan.requested_viewports or ["desktop"], scan.profile_requested, store_progress=True,
+            full_page=scan.full_page_requested, claim_token=scan.claim_token,
+        )
+        self.stdout.write(f"Finished scan #{scan.id} in {time.monotonic() - started_at:.1f}s")
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_websitescan_screenshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='alt_texts_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='alt_texts_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='color_contrast_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='color_contrast_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='doc_language_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='doc_language_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='empty_buttons_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='empty_buttons_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='empty_links_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='empty_links_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='input_labels_errors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='input_labels_ok',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='done', max_length=16),
+        ),
+        # scans created before this migration always ran to completion synchronously
+        migrations.AlterField(
+            model_name='websitescan',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16),
+        ),
+    ]
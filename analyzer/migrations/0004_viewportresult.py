@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_websitescan_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewportResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_language_ok', models.IntegerField(default=0)),
+                ('doc_language_errors', models.IntegerField(default=0)),
+                ('alt_texts_ok', models.IntegerField(default=0)),
+                ('alt_texts_errors', models.IntegerField(default=0)),
+                ('input_labels_ok', models.IntegerField(default=0)),
+                ('input_labels_errors', models.IntegerField(default=0)),
+                ('empty_buttons_ok', models.IntegerField(default=0)),
+                ('empty_buttons_errors', models.IntegerField(default=0)),
+                ('empty_links_ok', models.IntegerField(default=0)),
+                ('empty_links_errors', models.IntegerField(default=0)),
+                ('color_contrast_ok', models.IntegerField(default=0)),
+                ('color_contrast_errors', models.IntegerField(default=0)),
+                ('name', models.CharField(max_length=32)),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField()),
+                ('screenshot', models.ImageField(blank=True, null=True, upload_to='screenshots/')),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='viewports', to='analyzer.websitescan')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:24
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def violation_fingerprint(violation_id, html_snippet):
+    # a copy of analyzer.models.violation_fingerprint at the time of this migration, for violations without selector
+    element = " ".join(html_snippet.split())
+    return hashlib.sha1(f"{violation_id}|{element}".encode("utf8")).hexdigest()
+
+
+def fill_fingerprints(apps, schema_editor):
+    # selectors were not stored before, so existing violations are identified by their html snippet
+    Violation = apps.get_model('analyzer', 'Violation')
+    violations = Violation.objects.only('id', 'violation_id', 'html_snippet')
+    batch = []
+    for violation in violations.iterator(chunk_size=2000):
+        violation.fingerprint = violation_fingerprint(violation.violation_id, violation.html_snippet)
+        batch.append(violation)
+        if len(batch) == 2000:
+            Violation.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Violation.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_viewportresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='violation',
+            name='fingerprint',
+            field=models.CharField(default='', max_length=40),
+        ),
+        migrations.RunPython(fill_fingerprints, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['scan', 'fingerprint'], name='analyzer_vi_scan_id_eef295_idx'),
+        ),
+    ]
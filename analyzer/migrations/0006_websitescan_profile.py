@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0005_violation_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='profile',
+            field=models.FileField(blank=True, null=True, upload_to='profiles/'),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='profile_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
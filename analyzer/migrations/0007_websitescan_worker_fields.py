@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_websitescan_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='profile_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='progress',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='websitescan',
+            name='requested_viewports',
+            field=models.JSONField(default=list),
+        ),
+    ]
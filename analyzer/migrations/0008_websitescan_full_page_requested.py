@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0007_websitescan_worker_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='full_page_requested',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:39
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def snippet_fingerprint(violation_id, html_snippet):
+    # the fingerprint 0005_violation_fingerprint gave violations without selector
+    element = " ".join(html_snippet.split())
+    return hashlib.sha1(f"{violation_id}|{element}".encode("utf8")).hexdigest()
+
+
+def mark_snippet_fingerprints(apps, schema_editor):
+    # all violations of a scan were fingerprinted the same way, so one of them tells how
+    WebsiteScan = apps.get_model('analyzer', 'WebsiteScan')
+    Violation = apps.get_model('analyzer', 'Violation')
+    scan_ids = []
+    for scan_id in WebsiteScan.objects.filter(violations__isnull=False).distinct().values_list('id', flat=True):
+        violation = Violation.objects.filter(scan_id=scan_id).only('violation_id', 'html_snippet', 'fingerprint').first()
+        if violation.fingerprint == snippet_fingerprint(violation.violation_id, violation.html_snippet):
+            scan_ids.append(scan_id)
+    for start in range(0, len(scan_ids), 500):
+        WebsiteScan.objects.filter(id__in=scan_ids[start:start + 500]).update(snippet_fingerprints=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0008_websitescan_full_page_requested'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='snippet_fingerprints',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_snippet_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0009_websitescan_snippet_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
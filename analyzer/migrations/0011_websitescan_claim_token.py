@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0010_websitescan_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websitescan',
+            name='claim_token',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -1,12 +1,20 @@
+import hashlib
+import json
+
 from django.contrib.auth.models import User
 from django.db import models
 
-class WebsiteScan(models.Model):
-    url = models.URLField()
-    timestamp = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    screenshot = models.ImageField(upload_to="screenshots/", null=True, blank=True)
+def violation_fingerprint(violation_id: str, target: list | None, html_snippet: str) -> str:
+    """Returns a hash that identifies the same violation across scans. The selector of the element is used if it is
+    known, otherwise the html snippet with normalized whitespace"""
+    element = json.dumps(target) if target else " ".join(html_snippet.split())
+    return hashlib.sha1(f"{violation_id}|{element}".encode("utf8")).hexdigest()
+
 
+CHECK_KEYS = ("doc_language", "alt_texts", "input_labels", "empty_buttons", "empty_links", "color_contrast")
+
+
+class CheckCounters(models.Model):
     doc_language_ok = models.IntegerField(default=0)
     doc_language_errors = models.IntegerField(default=0)
     alt_texts_ok = models.IntegerField(default=0)
@@ -20,10 +28,64 @@ class WebsiteScan(models.Model):
     color_contrast_ok = models.IntegerField(default=0)
     color_contrast_errors = models.IntegerField(default=0)
 
+    class Meta:
+        abstract = True
+
+    def get_counters(self) -> tuple[dict, dict]:
+        """Returns the correct and wrong counters in the format used by AccessibilityTester"""
+        correct = {key: getattr(self, f"{key}_ok") for key in CHECK_KEYS}
+        wrong = {key: getattr(self, f"{key}_errors") for key in CHECK_KEYS}
+        return correct, wrong
+
+    def set_counters(self, correct: dict, wrong: dict) -> None:
+        for key in CHECK_KEYS:
+            setattr(self, f"{key}_ok", correct[key])
+            setattr(self, f"{key}_errors", wrong[key])
+
+
+class WebsiteScan(CheckCounters):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    url = models.URLField()
+    timestamp = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    screenshot = models.ImageField(upload_to="screenshots/", null=True, blank=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    # what the scan should run with, stored so a separate worker process can run it
+    requested_viewports = models.JSONField(default=list)
+    profile_requested = models.BooleanField(default=False)
+    full_page_requested = models.BooleanField(default=False)
+    # violations of scans from before fingerprints existed are identified by their html snippet instead of their
+    # selector, so they can only be compared with other such scans
+    snippet_fingerprints = models.BooleanField(default=False)
+    # progress of a scan run by a worker process, see scanner.ProgressDict
+    progress = models.JSONField(null=True, blank=True)
+    # last sign of life of the worker process running the scan, scans of stopped workers are queued again
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    # set when a worker claims the scan, only the run with the current token stores its results
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+    profile = models.FileField(upload_to="profiles/", null=True, blank=True)
+    profile_summary = models.TextField(blank=True, default="")
+
     def __str__(self):
         return f"{self.url} @ {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
 
+class ViewportResult(CheckCounters):
+    scan = models.ForeignKey(WebsiteScan, on_delete=models.CASCADE, related_name='viewports')
+    name = models.CharField(max_length=32)
+    width = models.IntegerField()
+    height = models.IntegerField()
+    screenshot = models.ImageField(upload_to="screenshots/", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.width}x{self.height})"
+
+
 class Violation(models.Model):
     scan = models.ForeignKey(WebsiteScan, on_delete=models.CASCADE, related_name='violations')
     violation_id = models.CharField(max_length=200)
@@ -33,6 +95,12 @@ class Violation(models.Model):
     help_url = models.URLField()
     failure_summary = models.TextField()
     html_snippet = models.TextField()
+    fingerprint = models.CharField(max_length=40, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["scan", "fingerprint"]),
+        ]
 
     def __str__(self):
         return self.violation_id
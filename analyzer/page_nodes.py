@@ -0,0 +1,245 @@
+"""This module captures a compact table of the page elements the accessibility checks work on"""
+import sys
+from array import array
+
+# only these attributes are kept, all others are dropped while capturing
+ATTRIBUTES = ("lang", "alt", "type", "aria-label", "aria-labelledby", "id", "for", "value", "title")
+# texts inside of these elements are never rendered
+INVISIBLE_ELEMENTS = ("script", "style", "title", "noscript")
+# pseudo elements between an element and the document of its iframe or its shadow root
+FRAME_DOCUMENT = "#document"
+SHADOW_ROOT = "#shadow-root"
+NO_ATTRIBUTES: dict[str, str] = {}
+
+# defines resolvePath(path), which returns the element of a NodeTable path or null, for use in other scripts
+RESOLVE_PATH_JS = """
+function resolvePath(path) {
+    let node = document;
+    for (const step of path.split("/").slice(1)) {
+        if (step === "#document") {
+            node = node.contentDocument;
+        } else if (step === "#shadow-root") {
+            node = node.shadowRoot;
+        } else {
+            const [, tag, position] = step.match(/^([^\\[]+)(?:\\[(\\d+)\\])?$/);
+            node = Array.from(node.children).filter((child) => child.localName === tag)[(position || 1) - 1];
+        }
+        if (!node) {
+            return null;
+        }
+    }
+    return node;
+}
+"""
+
+# walks the top document, the documents of same-origin iframes and open shadow roots in document order and returns
+# the columns of a NodeTable, the arguments are ATTRIBUTES, INVISIBLE_ELEMENTS and the node limit (null for none)
+CAPTURE_SCRIPT = """
+const [attributeNames, invisibleTags, maxNodes] = arguments;
+const table = {
+    tags: [], parents: [], ends: [], positions: [], siblingCounts: [], hasStrings: [], textParents: [], attrs: {},
+    truncated: false,
+};
+
+function addNode(tag, parent, position, siblingCount) {
+    const index = table.tags.length;
+    table.tags.push(tag);
+    table.parents.push(parent);
+    table.ends.push(index + 1);
+    table.positions.push(position);
+    table.siblingCounts.push(siblingCount);
+    table.hasStrings.push(0);
+    return index;
+}
+
+function visitChildren(parentNode, parentIndex, invisible) {
+    const counts = new Map();
+    for (const child of parentNode.children) {
+        counts.set(child.localName, (counts.get(child.localName) || 0) + 1);
+    }
+    const positions = new Map();
+    // texts directly inside of a shadow root belong to its host element, the pseudo element has no style
+    const textParent = parentNode.nodeType === Node.DOCUMENT_FRAGMENT_NODE ? table.parents[parentIndex] : parentIndex;
+    for (const child of parentNode.childNodes) {
+        if (table.truncated) {
+            return;
+        }
+        if (child.nodeType === Node.ELEMENT_NODE) {
+            const position = (positions.get(child.localName) || 0) + 1;
+            positions.set(child.localName, position);
+            visitElement(child, parentIndex, position, counts.get(child.localName), invisible);
+        } else if (parentIndex !== -1 && (child.nodeType === Node.TEXT_NODE || child.nodeType === Node.COMMENT_NODE)) {
+            table.hasStrings[parentIndex] = 1;
+            if (!invisible && child.nodeType === Node.TEXT_NODE && child.data.trim() !== "") {
+                table.textParents.push(textParent);
+            }
+        }
+    }
+}
+
+function visitElement(element, parentIndex, position, siblingCount, invisible) {
+    if (maxNodes !== null && table.tags.length >= maxNodes) {
+        table.truncated = true;
+        return;
+    }
+    const tag = element.localName;
+    const index = addNode(tag, parentIndex, position, siblingCount);
+    const attrs = {};
+    let hasAttrs = false;
+    for (const name of attributeNames) {
+        if (element.hasAttribute(name)) {
+            attrs[name] = element.getAttribute(name);
+            hasAttrs = true;
+        }
+    }
+    if (hasAttrs) {
+        table.attrs[index] = attrs;
+    }
+
+    invisible = invisible || invisibleTags.includes(tag);
+    visitChildren(element, index, invisible);
+
+    let root = element.shadowRoot;
+    let rootTag = "#shadow-root";
+    if (tag === "iframe" || tag === "frame") {
+        // contentDocument is null for cross-origin frames
+        root = element.contentDocument;
+        rootTag = "#document";
+    }
+    if (root && !table.truncated) {
+        const rootIndex = addNode(rootTag, index, 1, 1);
+        visitChildren(root, rootIndex, invisible);
+        table.ends[rootIndex] = table.tags.length;
+    }
+    table.ends[index] = table.tags.length;
+}
+
+visitChildren(document, -1, false);
+// parents always come before their children, so one backwards pass marks all ancestors of strings
+for (let i = table.tags.length - 1; i >= 0; i--) {
+    if (table.hasStrings[i] && table.parents[i] !== -1) {
+        table.hasStrings[table.parents[i]] = 1;
+    }
+}
+return table;
+"""
+
+
+class NodeTable:
+    """
+    Elements of a page stored in document order, every element is referenced by its index. The documents of
+    iframes and shadow roots are children of their iframe or host element with the tags FRAME_DOCUMENT and
+    SHADOW_ROOT, their elements follow as their children
+
+    Attributes
+    ----------
+    tags : list[str]
+        The tag name of every element
+    parents : array
+        The index of the parent element or -1 for top level elements
+    ends : array
+        The index after the last descendant, so the subtree of element i is range(i + 1, ends[i])
+    positions : array
+        1-based position of the element among the siblings with the same tag
+    sibling_counts : array
+        Number of siblings with the same tag, including the element itself
+    scopes : array
+        The index of the FRAME_DOCUMENT or SHADOW_ROOT the element is in, -1 for the top document
+    has_strings : bytearray
+        1 if the element contains any text or comment, at any depth
+    text_parents : array
+        For every non-empty rendered text in document order, the element that directly contains it. Texts directly
+        inside of a shadow root belong to its host element
+    attrs : dict[int, dict[str, str]]
+        The attributes listed in ATTRIBUTES, only for elements that have any of them
+    ids : dict[tuple[int, str], int]
+        The first element with a given id, by scope and id
+    truncated : bool
+        True if the page had more elements than the node limit and was not captured completely
+    """
+    __slots__ = (
+        "tags", "parents", "ends", "positions", "sibling_counts", "scopes", "has_strings", "text_parents", "attrs",
+        "ids", "truncated",
+    )
+
+    def __init__(self):
+        self.tags: list[str] = []
+        self.parents = array("i")
+        self.ends = array("i")
+        self.positions = array("i")
+        self.sibling_counts = array("i")
+        self.scopes = array("i")
+        self.has_strings = bytearray()
+        self.text_parents = array("i")
+        self.attrs: dict[int, dict[str, str]] = {}
+        self.ids: dict[tuple[int, str], int] = {}
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def find_all(self, *tags: str) -> list[int]:
+        """Returns the indexes of all elements with one of the given tags"""
+        return [index for index, tag in enumerate(self.tags) if tag in tags]
+
+    def find(self, tag: str) -> int | None:
+        """Returns the index of the first element with the given tag"""
+        try:
+            return self.tags.index(tag)
+        except ValueError:
+            return None
+
+    def get_attrs(self, index: int) -> dict[str, str]:
+        return self.attrs.get(index, NO_ATTRIBUTES)
+
+    def children(self, index: int, tag: str) -> list[int]:
+        """Returns the indexes of the direct children of an element with the given tag"""
+        return [
+            child for child in range(index + 1, self.ends[index])
+            if self.parents[child] == index and self.tags[child] == tag
+        ]
+
+    def xpath(self, index: int) -> str:
+        """Returns the path of an element, an xpath for elements of the top document. Elements in iframes and shadow
+        roots have an additional #document or #shadow-root step after the iframe or host element"""
+        components = []
+        while index != -1:
+            tag = self.tags[index]
+            components.append(tag if self.sibling_counts[index] == 1 else f"{tag}[{self.positions[index]}]")
+            index = self.parents[index]
+        components.reverse()
+        return f"/{'/'.join(components)}"
+
+
+def capture_node_table(driver, max_nodes: int | None = None) -> NodeTable:
+    """This function captures the page, including same-origin iframes and open shadow roots, in a NodeTable with one
+    script call. Capturing stops once max_nodes elements were found"""
+    data = driver.execute_script(CAPTURE_SCRIPT, ATTRIBUTES, INVISIBLE_ELEMENTS, max_nodes)
+
+    table = NodeTable()
+    table.tags = [sys.intern(tag) for tag in data["tags"]]
+    table.parents = array("i", data["parents"])
+    table.ends = array("i", data["ends"])
+    table.positions = array("i", data["positions"])
+    table.sibling_counts = array("i", data["siblingCounts"])
+    table.has_strings = bytearray(data["hasStrings"])
+    table.text_parents = array("i", data["textParents"])
+    table.attrs = {int(index): attrs for index, attrs in data["attrs"].items()}
+    table.truncated = data["truncated"]
+    del data
+
+    table.scopes = array("i", bytes(4 * len(table)))
+    for index, parent in enumerate(table.parents):
+        if parent == -1:
+            table.scopes[index] = -1
+        elif table.tags[parent] in (FRAME_DOCUMENT, SHADOW_ROOT):
+            table.scopes[index] = parent
+        else:
+            table.scopes[index] = table.scopes[parent]
+
+    for index, attrs in table.attrs.items():
+        if "id" in attrs:
+            key = (table.scopes[index], attrs["id"])
+            if key not in table.ids or table.ids[key] > index:
+                table.ids[key] = index
+    return table
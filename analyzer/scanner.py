@@ -0,0 +1,288 @@
+"""This module runs website scans in a bounded background thread pool and keeps track of their progress. Selenium
+and axe are only imported once a scan runs, so web processes that never run a scan don't load them"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import TYPE_CHECKING, TypedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import ViewportResult, Violation, WebsiteScan, violation_fingerprint
+from .scoring import SCORE_MULTIPLIERS, VIEWPORTS, CounterDict
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+
+class ClaimLostError(Exception):
+    """Raised when the results of a scan are stored, but the scan was queued again and claimed by another run"""
+
+
+class ProgressDict(TypedDict):
+    status: str
+    phase: str
+    correct: CounterDict
+    wrong: CounterDict
+
+
+class ViewportDict(TypedDict):
+    name: str
+    correct: CounterDict
+    wrong: CounterDict
+    screenshot: bytes
+
+
+# selenium work is blocking, so scans run in a fixed number of threads instead of one thread per request
+_executor = ThreadPoolExecutor(max_workers=settings.SCAN_MAX_WORKERS, thread_name_prefix="scan")
+_progress: dict[int, ProgressDict] = {}
+_progress_lock = threading.Lock()
+log = logging.getLogger(__name__)
+# number of functions listed in the profile summary
+PROFILE_SUMMARY_LINES = 25
+# only one profiler can be active per process since Python 3.12, so profiled scans wait for each other
+_profile_lock = threading.Lock()
+
+
+def _set_progress(scan_id: int, status: str, phase: str, correct: CounterDict, wrong: CounterDict):
+    """This function stores a snapshot of the scan progress, readers never see a partially updated entry"""
+    with _progress_lock:
+        _progress[scan_id] = {
+            "status": status,
+            "phase": phase,
+            "correct": dict(correct),
+            "wrong": dict(wrong),
+        }
+
+
+def get_progress(scan_id: int) -> ProgressDict | None:
+    """This function returns the progress of a scan running in this process or None if there is no such scan"""
+    with _progress_lock:
+        return _progress.get(scan_id)
+
+
+def submit_scan(scan: WebsiteScan):
+    """This function queues a pending scan for execution in the scan thread pool. With SCAN_WORKER_PROCESS the scan
+    is left pending in the database for the scan_worker command instead"""
+    if settings.SCAN_WORKER_PROCESS:
+        return
+    empty: CounterDict = dict.fromkeys(SCORE_MULTIPLIERS, 0)
+    _set_progress(scan.id, WebsiteScan.Status.PENDING, "", empty, empty)
+    _executor.submit(
+        run_scan, scan.id, scan.url, scan.requested_viewports, scan.profile_requested, full_page=scan.full_page_requested,
+    )
+
+
+def claim_pending_scan() -> WebsiteScan | None:
+    """This function marks the oldest pending scan as running and returns it, None if no scan is pending. A scan is
+    only claimed by one worker, even if several workers run at the same time"""
+    while True:
+        scan = WebsiteScan.objects.filter(status=WebsiteScan.Status.PENDING).order_by("id").first()
+        if scan is None:
+            return None
+        claim_token = uuid4().hex
+        if WebsiteScan.objects.filter(id=scan.id, status=WebsiteScan.Status.PENDING).update(
+                status=WebsiteScan.Status.RUNNING, heartbeat=timezone.now(), claim_token=claim_token):
+            scan.status = WebsiteScan.Status.RUNNING
+            scan.claim_token = claim_token
+            return scan
+
+
+def requeue_stale_scans() -> int:
+    """This function queues running scans again whose worker sent no heartbeat for SCAN_STALE_TIMEOUT seconds,
+    because the worker process was stopped or crashed. Returns the number of queued scans"""
+    stale_before = timezone.now() - timedelta(seconds=settings.SCAN_STALE_TIMEOUT)
+    return WebsiteScan.objects.filter(status=WebsiteScan.Status.RUNNING, heartbeat__lt=stale_before).update(
+        status=WebsiteScan.Status.PENDING, heartbeat=None, progress=None, claim_token=None,
+    )
+
+
+def _send_heartbeats(scan_id: int, claim_token: str, stopped: threading.Event):
+    """This function keeps the heartbeat of a claimed scan fresh until stopped is set, also while the scan waits
+    for the profiler or runs a long phase"""
+    try:
+        while not stopped.wait(settings.SCAN_HEARTBEAT_INTERVAL):
+            try:
+                WebsiteScan.objects.filter(id=scan_id, claim_token=claim_token).update(heartbeat=timezone.now())
+            except Exception:
+                log.exception("Heartbeat of scan %s failed", scan_id)
+    finally:
+        connections.close_all()
+
+
+def run_scan(
+        scan_id: int, url: str, viewports: list[str], profile: bool = False, store_progress: bool = False,
+        full_page: bool = False, claim_token: str | None = None,
+):
+    """This function runs all checks for a scan and stores the results. If profile is set, the profile is stored
+    with the scan, also when the scan failed. If store_progress is set, the progress is also written to the
+    database, for web processes that don't run the scan themselves. If full_page is set, the screenshots show the
+    whole page. A scan claimed by a worker passes its claim_token, its heartbeat is kept fresh while it runs and its
+    results are only stored if it was not claimed by another run in the meantime"""
+    scan_rows = WebsiteScan.objects.filter(id=scan_id)
+    if claim_token is not None:
+        scan_rows = scan_rows.filter(claim_token=claim_token)
+
+    def report(phase: str, correct: CounterDict, wrong: CounterDict):
+        _set_progress(scan_id, WebsiteScan.Status.RUNNING, phase, correct, wrong)
+        if store_progress:
+            scan_rows.update(progress=get_progress(scan_id))
+
+    heartbeat_stopped = threading.Event()
+    if claim_token is not None:
+        threading.Thread(
+            target=_send_heartbeats, args=(scan_id, claim_token, heartbeat_stopped), name=f"heartbeat-{scan_id}",
+            daemon=True,
+        ).start()
+
+    profiler = cProfile.Profile() if profile else None
+    try:
+        scan_rows.update(status=WebsiteScan.Status.RUNNING)
+        if profiler is None:
+            viewport_results, results = perform_scan(url, viewports, report, full_page=full_page)
+        else:
+            with _profile_lock:
+                profiler.enable()
+                try:
+                    viewport_results, results = perform_scan(url, viewports, report, full_page=full_page)
+                finally:
+                    profiler.disable()
+        save_results(WebsiteScan.objects.get(id=scan_id), viewport_results, results, claim_token)
+    except ClaimLostError:
+        log.warning("Scan %s of %s was claimed by another run, its results are dropped", scan_id, url)
+    except Exception:
+        log.exception("Scan %s of %s failed", scan_id, url)
+        scan_rows.update(status=WebsiteScan.Status.FAILED)
+    finally:
+        heartbeat_stopped.set()
+        with _progress_lock:
+            _progress.pop(scan_id, None)
+        if profiler is not None:
+            # a profile that can't be stored must not keep the scan from finishing
+            try:
+                save_profile(scan_id, profiler)
+            except Exception:
+                log.exception("Storing the profile of scan %s failed", scan_id)
+        close_old_connections()
+
+
+def save_profile(scan_id: int, profiler: cProfile.Profile):
+    """This function stores the profile in the format of pstats and a summary of the slowest functions with a scan,
+    by their own time and by the time including the functions they call"""
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    # the same format as written by Stats.dump_stats
+    profile_data = marshal.dumps(stats.stats)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_SUMMARY_LINES)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_SUMMARY_LINES)
+
+    scan = WebsiteScan.objects.get(id=scan_id)
+    scan.profile_summary = summary.getvalue()
+    scan.profile.save(f"{uuid4()}.prof", ContentFile(profile_data), save=False)
+    scan.save(update_fields=["profile", "profile_summary"])
+
+
+def perform_scan(
+        url: str, viewports: list[str], progress_callback=None, driver: "webdriver.Firefox | None" = None,
+        full_page: bool = False,
+) -> tuple[list[ViewportDict], dict]:
+    """This function runs the checks and axe for a page and returns the results per viewport and the axe results.
+    The page is loaded once for the first viewport, the other viewports only resize the window and re-run the layout
+    dependent checks. A given driver is reused and left running, otherwise a new browser is started and closed. With full_page the
+    screenshots show the whole page, up to SCAN_SCREENSHOT_MAX_HEIGHT, with the axe violations outlined"""
+    from axe_selenium_python import Axe
+
+    from .accessibility_tester import AccessibilityTester
+
+    width, height = VIEWPORTS[viewports[0]]
+    tester = AccessibilityTester(
+        url, browser_height=height, browser_width=width, progress_callback=progress_callback,
+        max_nodes=settings.SCAN_MAX_NODES, contrast_samples=settings.SCAN_CONTRAST_SAMPLES,
+    )
+    try:
+        tester.report_progress("start_driver")
+        tester.start_driver(driver)
+        tester.test_page()
+
+        tester.report_progress("axe")
+        axe = Axe(tester.driver)
+        axe.inject()
+        results = axe.run()
+        if full_page:
+            from .screenshots import capture_full_page
+
+            targets = [node["target"] for v in results["violations"] for node in v["nodes"] if node.get("target")]
+
+        viewport_results = []
+        for i, name in enumerate(viewports):
+            if i:
+                tester.report_progress(f"viewport_{name}")
+                tester.test_viewport(*VIEWPORTS[name])
+            tester.report_progress("screenshot")
+            if full_page:
+                screenshot = capture_full_page(tester.driver, targets, settings.SCAN_SCREENSHOT_MAX_HEIGHT)
+            else:
+                screenshot = tester.driver.get_screenshot_as_png()
+            viewport_results.append(ViewportDict(
+                name=name,
+                correct=dict(tester.correct),
+                wrong=dict(tester.wrong),
+                screenshot=screenshot,
+            ))
+    finally:
+        if driver is None and tester.driver is not None:
+            tester.driver.quit()
+
+    return viewport_results, results
+
+
+def save_results(
+        scan: WebsiteScan, viewport_results: list[ViewportDict], results: dict, claim_token: str | None = None,
+):
+    """This function writes the counters, screenshots and axe violations of a finished scan to the database. The
+    scan itself keeps the results of the first viewport, it is created if it is not saved yet. Everything is written
+    in one transaction and the scan is marked as done last, so nobody sees a done scan with missing results. With a
+    claim_token, ClaimLostError is raised and nothing is written if the scan was claimed by another run"""
+    with transaction.atomic():
+        # the update locks the scan row until the end of the transaction, so it can't be queued again meanwhile
+        if claim_token is not None and not WebsiteScan.objects.filter(
+                id=scan.id, claim_token=claim_token, status=WebsiteScan.Status.RUNNING).update(
+                heartbeat=timezone.now()):
+            raise ClaimLostError(scan.id)
+        scan.set_counters(viewport_results[0]["correct"], viewport_results[0]["wrong"])
+        scan.screenshot.save(f"{uuid4()}.png", ContentFile(viewport_results[0]["screenshot"]), save=False)
+        scan.save()
+
+        for result in viewport_results:
+            width, height = VIEWPORTS[result["name"]]
+            viewport = ViewportResult(scan=scan, name=result["name"], width=width, height=height)
+            viewport.set_counters(result["correct"], result["wrong"])
+            viewport.screenshot.save(f"{uuid4()}.png", ContentFile(result["screenshot"]), save=True)
+
+        Violation.objects.bulk_create([
+            Violation(
+                scan=scan,
+                violation_id=v["id"],
+                impact=v.get("impact"),
+                description=v["description"],
+                help_text=v["help"],
+                help_url=v["helpUrl"],
+                failure_summary=node.get("failureSummary", ""),
+                html_snippet=node.get("html", ""),
+                fingerprint=violation_fingerprint(v["id"], node.get("target"), node.get("html", "")),
+            )
+            for v in results["violations"]
+            for node in v["nodes"]
+        ])
+
+        scan.status = WebsiteScan.Status.DONE
+        scan.progress = None
+        scan.save(update_fields=["status", "progress"])
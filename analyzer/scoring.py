@@ -0,0 +1,58 @@
+"""This module includes the score calculation and the definitions that are shared with the web views. It has no
+dependencies on the scanning stack, so the web process can import it without loading selenium"""
+from typing import TypedDict
+
+SCORE_MULTIPLIERS = {
+    "doc_language": .9,
+    "alt_texts": .9,
+    "input_labels": .9,
+    "empty_buttons": .9,
+    "empty_links": .9,
+    "color_contrast": .3,
+}
+
+# name -> (width, height) of the browser window
+VIEWPORTS = {
+    "mobile": (375, 667),
+    "tablet": (768, 1024),
+    "desktop": (1280, 720),
+}
+
+
+class CounterDict(TypedDict):
+    doc_language: int
+    alt_texts: int
+    input_labels: int
+    empty_buttons: int
+    empty_links: int
+    color_contrast: int
+
+
+def calculate_result(correct: dict, wrong: dict) -> float:
+    """This function calculates the result of the test and prints it to the console"""
+    # calculate correct and false implementations
+    total: dict = {}
+    for key, count in correct.items():
+        if key not in total:
+            total[key] = 0
+        total[key] += count
+    for key, count in wrong.items():
+        if key not in total:
+            total[key] = 0
+        total[key] += count
+
+    scores = {}
+    for key, total_score in total.items():
+        if not total_score:
+            continue
+        scores[key] = correct.get(key, 0) / total_score
+
+    corrected_scores = {}
+    for key, score in scores.items():
+        corrected_scores[key] = score * SCORE_MULTIPLIERS[key]
+
+    corrected_score = sum(scores.values()) / len(scores)
+    corrected_score /= sum(SCORE_MULTIPLIERS.values()) / len(SCORE_MULTIPLIERS)
+    corrected_score = max(1., min(0., corrected_score))
+
+    return corrected_score
@@ -0,0 +1,134 @@
+"""This module captures screenshots of the whole page by scrolling through it and stitching the tiles"""
+import io
+import struct
+import zlib
+
+from PIL import Image, ImageDraw
+
+# color and width of the outlines drawn around elements with violations
+OVERLAY_COLOR = (220, 53, 69)
+OVERLAY_WIDTH = 3
+
+# returns the size of the page and of the viewport and the boxes of the elements of the given axe targets in page
+# coordinates, targets that lead through iframes are offset by the position of the iframe
+PAGE_METRICS_SCRIPT = """
+const targets = arguments[0];
+function findBox(target) {
+    let root = document;
+    let offsetX = 0;
+    let offsetY = 0;
+    let element = null;
+    for (let i = 0; i < target.length; i++) {
+        // a list of selectors leads through shadow roots
+        const selectors = Array.isArray(target[i]) ? target[i] : [target[i]];
+        let scope = root;
+        for (const selector of selectors) {
+            try {
+                element = scope.querySelector(selector);
+            } catch (e) {
+                return null;
+            }
+            if (element === null) {
+                return null;
+            }
+            scope = element.shadowRoot || element;
+        }
+        if (i < target.length - 1) {
+            if (!element.contentDocument) {
+                return null;
+            }
+            const frameRect = element.getBoundingClientRect();
+            offsetX += frameRect.left;
+            offsetY += frameRect.top;
+            root = element.contentDocument;
+        }
+    }
+    const rect = element.getBoundingClientRect();
+    return [rect.left + offsetX + window.scrollX, rect.top + offsetY + window.scrollY, rect.width, rect.height];
+}
+
+return {
+    pageHeight: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+    viewportWidth: window.innerWidth,
+    viewportHeight: window.innerHeight,
+    boxes: targets.map(findBox).filter((box) => box !== null),
+};
+"""
+# scrolls without animation, even if the page sets scroll-behavior: smooth, so scrollY is the new position right away
+SCROLL_SCRIPT = """
+window.scrollTo({top: arguments[0], left: 0, behavior: "instant"});
+return window.scrollY;
+"""
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def capture_full_page(driver, targets: list, max_height: int) -> bytes:
+    """This function scrolls through the page and returns a png of the whole page, at most max_height css pixels
+    high, with the elements of the given axe targets outlined. The png is encoded while scrolling, so only one tile
+    is held in memory"""
+    metrics = driver.execute_script(PAGE_METRICS_SCRIPT, targets)
+    viewport_height = metrics["viewportHeight"]
+    page_height = min(max(metrics["pageHeight"], viewport_height), max_height)
+
+    out = io.BytesIO()
+    compressor = zlib.compressobj()
+    width = height = scale = None
+    written = 0
+    try:
+        while height is None or written < height:
+            y = written / scale if scale else 0
+            scroll_y = driver.execute_script(SCROLL_SCRIPT, y)
+            tile = Image.open(io.BytesIO(driver.get_screenshot_as_png())).convert("RGB")
+            if width is None:
+                # the first tile decides the size in device pixels
+                width = tile.width
+                scale = tile.width / metrics["viewportWidth"]
+                height = round(page_height * scale)
+                out.write(b"\x89PNG\r\n\x1a\n")
+                out.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+            elif tile.width != width:
+                tile = tile.resize((width, round(tile.height * width / tile.width)))
+
+            draw = ImageDraw.Draw(tile)
+            for left, top, box_width, box_height in metrics["boxes"]:
+                if top + box_height < scroll_y or top > scroll_y + viewport_height:
+                    continue
+                draw.rectangle(
+                    (
+                        left * scale, (top - scroll_y) * scale,
+                        (left + box_width) * scale, (top - scroll_y + box_height) * scale,
+                    ),
+                    outline=OVERLAY_COLOR, width=OVERLAY_WIDTH,
+                )
+
+            # the last tile can't be scrolled as far as requested, so it overlaps with the previous one
+            first_row = round((y - scroll_y) * scale)
+            rows = min(tile.height - first_row, height - written)
+            if rows <= 0:
+                break
+            out.write(_encode_rows(compressor, tile.crop((0, first_row, width, first_row + rows))))
+            written += rows
+            tile.close()
+
+        if written < height:
+            # the page got shorter while scrolling, the rest stays white
+            out.write(_encode_rows(compressor, Image.new("RGB", (width, height - written), (255, 255, 255))))
+    finally:
+        driver.execute_script(SCROLL_SCRIPT, 0)
+
+    out.write(_png_chunk(b"IDAT", compressor.flush()))
+    out.write(_png_chunk(b"IEND", b""))
+    return out.getvalue()
+
+
+def _encode_rows(compressor, image: Image.Image) -> bytes:
+    """Compresses the rows of an image, every row gets the png filter type 0, and returns them as an IDAT chunk"""
+    stride = image.width * 3
+    raw = image.tobytes()
+    data = compressor.compress(b"".join(
+        b"\x00" + raw[row * stride:(row + 1) * stride] for row in range(image.height)
+    ))
+    return _png_chunk(b"IDAT", data) if data else b""
@@ -1,3 +1,346 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from . import scanner
+from .management.commands.scan_urls import Checkpoint, read_sitemap
+from .models import Violation, WebsiteScan, violation_fingerprint
+from .page_nodes import capture_node_table
+from .screenshots import PAGE_METRICS_SCRIPT, capture_full_page
+
+COUNTERS = dict.fromkeys(scanner.SCORE_MULTIPLIERS, 1)
+
+
+def create_png(width: int = 2, height: int = 2) -> bytes:
+    data = io.BytesIO()
+    Image.new("RGB", (width, height)).save(data, "PNG")
+    return data.getvalue()
+
+
+def create_violation(scan: WebsiteScan, violation_id: str, target: list | None, html: str = "<a></a>") -> Violation:
+    return Violation.objects.create(
+        scan=scan, violation_id=violation_id, description="", help_text="", help_url="", failure_summary="",
+        html_snippet=html, fingerprint=violation_fingerprint(violation_id, target, html),
+    )
+
+
+class ViolationFingerprintTests(TestCase):
+    def test_selector_is_preferred_over_snippet(self):
+        self.assertEqual(
+            violation_fingerprint("image-alt", ["#logo"], "<img>"),
+            violation_fingerprint("image-alt", ["#logo"], "<img src='other.png'>"),
+        )
+        self.assertNotEqual(
+            violation_fingerprint("image-alt", ["#logo"], "<img>"),
+            violation_fingerprint("image-alt", ["#banner"], "<img>"),
+        )
+
+    def test_snippet_whitespace_is_normalized(self):
+        self.assertEqual(
+            violation_fingerprint("label", None, "<input\n   type='text'>"),
+            violation_fingerprint("label", None, "<input type='text'>"),
+        )
+
+    def test_rule_is_part_of_fingerprint(self):
+        self.assertNotEqual(
+            violation_fingerprint("label", ["input"], ""), violation_fingerprint("image-alt", ["input"], ""),
+        )
+
+
+class ResultsDiffTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.other_user = User.objects.create_user("other", password="password")
+        self.client.login(username="owner", password="password")
+
+    def create_scan(self, user: User | None = None, **fields) -> WebsiteScan:
+        return WebsiteScan.objects.create(
+            url="https://example.com", user=user or self.user, status=WebsiteScan.Status.DONE, alt_texts_ok=1,
+            **fields,
+        )
+
+    def get_results(self, scan: WebsiteScan, compare_to=None):
+        url = f"/results/?scan_id={scan.id}"
+        if compare_to is not None:
+            url += f"&compare_to={compare_to}"
+        return self.client.get(url)
+
+    def test_new_and_fixed_violations(self):
+        old_scan = self.create_scan()
+        create_violation(old_scan, "image-alt", ["#logo"])
+        create_violation(old_scan, "label", ["#search"])
+        new_scan = self.create_scan()
+        create_violation(new_scan, "image-alt", ["#logo"])
+        create_violation(new_scan, "link-name", ["#more"])
+
+        diff = self.get_results(new_scan, old_scan.id).context["diff"]
+        self.assertEqual(diff["new_count"], 1)
+        self.assertEqual(diff["fixed_count"], 1)
+        self.assertEqual([v.violation_id for v in diff["new"]], ["link-name"])
+        self.assertEqual([v.violation_id for v in diff["fixed"]], ["label"])
+
+    def test_other_users_scans_are_not_offered(self):
+        scan = self.create_scan()
+        own_scan = self.create_scan()
+        foreign_scan = self.create_scan(user=self.other_user)
+
+        response = self.get_results(scan)
+        self.assertEqual([other.id for other in response.context["other_scans"]], [own_scan.id])
+        self.assertEqual(self.get_results(scan, foreign_scan.id).status_code, 404)
+
+    def test_scans_with_snippet_fingerprints_are_not_compared_with_new_scans(self):
+        scan = self.create_scan()
+        backfilled_scan = self.create_scan(snippet_fingerprints=True)
+
+        self.assertEqual(list(self.get_results(scan).context["other_scans"]), [])
+        self.assertEqual(self.get_results(scan, backfilled_scan.id).status_code, 404)
+
+    def test_invalid_compare_to(self):
+        scan = self.create_scan()
+        self.assertEqual(self.get_results(scan, "abc").status_code, 404)
+        self.assertEqual(self.get_results(scan, 999).status_code, 404)
+
+
+class SnippetFingerprintMigrationTests(TransactionTestCase):
+    before = [("analyzer", "0004_viewportresult")]
+    fingerprinted = [("analyzer", "0008_websitescan_full_page_requested")]
+    after = [("analyzer", "0009_websitescan_snippet_fingerprints")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfilled_scans_are_detected(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model("auth", "User").objects.create(username="owner")
+        HistoricalScan = apps.get_model("analyzer", "WebsiteScan")
+        old_scan = HistoricalScan.objects.create(url="https://example.com", user=user)
+        empty_scan = HistoricalScan.objects.create(url="https://example.com", user=user)
+        apps.get_model("analyzer", "Violation").objects.create(
+            scan=old_scan, violation_id="image-alt", description="", help_text="", help_url="", failure_summary="",
+            html_snippet="<img>",
+        )
+
+        apps = self.migrate(self.fingerprinted)
+        new_scan = apps.get_model("analyzer", "WebsiteScan").objects.create(url="https://example.com", user_id=user.id)
+        apps.get_model("analyzer", "Violation").objects.create(
+            scan=new_scan, violation_id="image-alt", description="", help_text="", help_url="", failure_summary="",
+            html_snippet="<img>", fingerprint=violation_fingerprint("image-alt", ["img"], "<img>"),
+        )
+
+        apps = self.migrate(self.after)
+        snippet_fingerprints = dict(
+            apps.get_model("analyzer", "WebsiteScan").objects.values_list("id", "snippet_fingerprints")
+        )
+        self.assertEqual(snippet_fingerprints, {old_scan.id: True, empty_scan.id: False, new_scan.id: False})
+
+
+class ScanClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="owner")
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def create_scan(self, **fields) -> WebsiteScan:
+        return WebsiteScan.objects.create(url="https://example.com", user=self.user, **fields)
+
+    def test_oldest_pending_scan_is_claimed_once(self):
+        first_scan = self.create_scan()
+        second_scan = self.create_scan()
+        self.create_scan(status=WebsiteScan.Status.DONE)
+
+        claimed = [scanner.claim_pending_scan(), scanner.claim_pending_scan(), scanner.claim_pending_scan()]
+        self.assertEqual([scan.id if scan else None for scan in claimed], [first_scan.id, second_scan.id, None])
+        self.assertNotEqual(claimed[0].claim_token, claimed[1].claim_token)
+        first_scan.refresh_from_db()
+        self.assertEqual(first_scan.status, WebsiteScan.Status.RUNNING)
+        self.assertIsNotNone(first_scan.heartbeat)
+
+    @override_settings(SCAN_STALE_TIMEOUT=60)
+    def test_only_stale_scans_are_queued_again(self):
+        stale_scan = self.create_scan(
+            status=WebsiteScan.Status.RUNNING, heartbeat=timezone.now() - timedelta(minutes=5), claim_token="old",
+        )
+        alive_scan = self.create_scan(status=WebsiteScan.Status.RUNNING, heartbeat=timezone.now())
+        # scans run by a web process have no heartbeat
+        web_scan = self.create_scan(status=WebsiteScan.Status.RUNNING)
+
+        self.assertEqual(scanner.requeue_stale_scans(), 1)
+        statuses = dict(WebsiteScan.objects.values_list("id", "status"))
+        self.assertEqual(statuses[stale_scan.id], WebsiteScan.Status.PENDING)
+        self.assertEqual(statuses[alive_scan.id], WebsiteScan.Status.RUNNING)
+        self.assertEqual(statuses[web_scan.id], WebsiteScan.Status.RUNNING)
+        stale_scan.refresh_from_db()
+        self.assertIsNone(stale_scan.claim_token)
+
+    def test_results_of_a_lost_claim_are_dropped(self):
+        self.create_scan()
+        lost_claim = scanner.claim_pending_scan()
+        WebsiteScan.objects.filter(id=lost_claim.id).update(heartbeat=timezone.now() - timedelta(days=1))
+        scanner.requeue_stale_scans()
+        current_claim = scanner.claim_pending_scan()
+
+        viewport_results = [{"name": "desktop", "correct": COUNTERS, "wrong": COUNTERS, "screenshot": create_png()}]
+        results = {"violations": [{
+            "id": "image-alt", "description": "", "help": "", "helpUrl": "",
+            "nodes": [{"target": ["img"], "html": "<img>"}],
+        }]}
+        with self.settings(MEDIA_ROOT=self.media_root):
+            with self.assertRaises(scanner.ClaimLostError):
+                scanner.save_results(
+                    WebsiteScan.objects.get(id=lost_claim.id), viewport_results, results, lost_claim.claim_token,
+                )
+            scanner.save_results(
+                WebsiteScan.objects.get(id=current_claim.id), viewport_results, results, current_claim.claim_token,
+            )
+
+        scan = WebsiteScan.objects.get(id=current_claim.id)
+        self.assertEqual(scan.status, WebsiteScan.Status.DONE)
+        self.assertEqual(scan.viewports.count(), 1)
+        self.assertEqual(scan.violations.count(), 1)
+
+
+class ScanUrlsTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_sitemap_index_is_followed(self):
+        (self.directory / "pages.xml").write_text(
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<url><loc> https://example.com/a </loc></url><url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        )
+        (self.directory / "sitemap.xml").write_text(
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<sitemap><loc>pages.xml</loc></sitemap>"
+            "</sitemapindex>"
+        )
+        self.assertEqual(
+            read_sitemap(str(self.directory / "sitemap.xml")), ["https://example.com/a", "https://example.com/b"],
+        )
+
+    def test_checkpoint_only_skips_done_urls(self):
+        path = self.directory / "urls.checkpoint.json"
+        checkpoint = Checkpoint(path)
+        checkpoint.done.add("https://example.com/a")
+        checkpoint.failed["https://example.com/b"] = "TimeoutException"
+        checkpoint.save()
+
+        self.assertEqual(json.loads(path.read_text())["failed"], {"https://example.com/b": "TimeoutException"})
+        resumed = Checkpoint(path)
+        self.assertEqual(resumed.done, {"https://example.com/a"})
+        self.assertEqual(resumed.failed, {})
+
+
+class StubDriver:
+    """Returns the given result for every script"""
+    def __init__(self, result):
+        self.result = result
+
+    def execute_script(self, script, *args):
+        return self.result
+
+
+class NodeTableTests(TestCase):
+    def setUp(self):
+        # <html><body><p/><p><iframe>#document<html/></iframe></p><my-tag>#shadow-root<span/></my-tag></body></html>
+        self.page = capture_node_table(StubDriver({
+            "tags": ["html", "body", "p", "p", "iframe", "#document", "html", "my-tag", "#shadow-root", "span"],
+            "parents": [-1, 0, 1, 1, 3, 4, 5, 1, 7, 8],
+            "ends": [10, 10, 3, 7, 7, 7, 7, 10, 10, 10],
+            "positions": [1, 1, 1, 2, 1, 1, 1, 1, 1, 1],
+            "siblingCounts": [1, 1, 2, 2, 1, 1, 1, 1, 1, 1],
+            "hasStrings": [1, 1, 0, 1, 0, 0, 0, 1, 1, 1],
+            "textParents": [9, 3],
+            "attrs": {"2": {"id": "intro"}, "6": {"id": "intro", "lang": "en"}},
+            "truncated": False,
+        }))
+
+    def test_xpath(self):
+        self.assertEqual(self.page.xpath(3), "/html/body/p[2]")
+        self.assertEqual(self.page.xpath(6), "/html/body/p[2]/iframe/#document/html")
+        self.assertEqual(self.page.xpath(9), "/html/body/my-tag/#shadow-root/span")
+
+    def test_ids_are_scoped_by_document(self):
+        self.assertEqual(self.page.ids, {(-1, "intro"): 2, (5, "intro"): 6})
+        self.assertEqual(list(self.page.scopes), [-1, -1, -1, -1, -1, -1, 5, -1, -1, 8])
+
+    def test_queries(self):
+        self.assertEqual(self.page.find_all("p", "span"), [2, 3, 9])
+        self.assertEqual(self.page.find("iframe"), 4)
+        self.assertIsNone(self.page.find("img"))
+        self.assertEqual(self.page.children(1, "p"), [2, 3])
+        self.assertEqual(self.page.get_attrs(6), {"id": "intro", "lang": "en"})
+        self.assertEqual(self.page.get_attrs(0), {})
+
+
+class ScrollingDriver:
+    """A page of viewport_width x page_height css pixels, every row has its own color"""
+    def __init__(self, page_height: int, viewport_width: int = 100, viewport_height: int = 50, scale: int = 2):
+        self.page_height = page_height
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.scale = scale
+        self.scroll_y = 0
+        self.page = Image.new("RGB", (viewport_width * scale, page_height * scale))
+        for row in range(page_height * scale):
+            self.page.paste((row // scale % 256, 0, 0), (0, row, viewport_width * scale, row + 1))
+
+    def execute_script(self, script, *args):
+        if script == PAGE_METRICS_SCRIPT:
+            return {
+                "pageHeight": self.page_height, "viewportWidth": self.viewport_width,
+                "viewportHeight": self.viewport_height, "boxes": [[10, 60, 20, 10]],
+            }
+        self.scroll_y = max(0, min(args[0], self.page_height - self.viewport_height))
+        return self.scroll_y
+
+    def get_screenshot_as_png(self):
+        tile = self.page.crop((
+            0, int(self.scroll_y * self.scale),
+            self.viewport_width * self.scale, int((self.scroll_y + self.viewport_height) * self.scale),
+        ))
+        data = io.BytesIO()
+        tile.save(data, "PNG")
+        return data.getvalue()
+
+
+class FullPageScreenshotTests(TestCase):
+    def capture(self, driver: ScrollingDriver, max_height: int = 10000) -> Image.Image:
+        image = Image.open(io.BytesIO(capture_full_page(driver, [["#target"]], max_height)))
+        image.load()
+        return image
+
+    def test_tiles_are_stitched_in_order(self):
+        driver = ScrollingDriver(page_height=173)
+        image = self.capture(driver)
+
+        self.assertEqual(image.size, (200, 346))
+        for row in range(0, 346, 7):
+            self.assertEqual(image.getpixel((150, row)), (row // 2 % 256, 0, 0))
+        self.assertEqual(driver.scroll_y, 0)
+
+    def test_violations_are_outlined(self):
+        image = self.capture(ScrollingDriver(page_height=173))
+        self.assertEqual(image.getpixel((20, 120)), (220, 53, 69))
+
+    def test_height_is_capped(self):
+        self.assertEqual(self.capture(ScrollingDriver(page_height=300), max_height=130).size, (200, 260))
+
+    def test_short_page_has_viewport_height(self):
+        self.assertEqual(self.capture(ScrollingDriver(page_height=20)).size, (200, 100))
@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path("", views.url_check_view, name="url_check"),
+    path("scan-status/", views.scan_status_view, name="scan_status"),
+    path("scan-events/", views.scan_events_view, name="scan_events"),
     path("results/", views.results_view, name="results"),
     path("register/", views.register_view, name="register"),
     path("my-scans/", views.my_scans_view, name="my_scans"),
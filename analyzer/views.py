@@ -1,17 +1,22 @@
-from uuid import uuid4
+import asyncio
+import json
+import random
 
-from axe_selenium_python import Axe
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from django.core.files.base import ContentFile
-from django.shortcuts import render, redirect
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render, redirect
 from django.urls import reverse
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
 
-from .accessibility_tester import AccessibilityTester
+from . import scanner
 from .forms import URLForm, RegisterForm
-from .models import Violation, WebsiteScan
+from .models import WebsiteScan
+from .scoring import calculate_result
+
+# maximum number of new and fixed violations listed when two scans are compared
+DIFF_DISPLAY_LIMIT = 100
 
 
 def register_view(request):
@@ -27,93 +32,120 @@ def register_view(request):
 
 
 @login_required
-def url_check_view(request):
+async def url_check_view(request):
+    user = await request.auser()
     if request.method == "POST":
         form = URLForm(request.POST)
         if not form.is_valid():
-            return render(request, "check_form.html", {"form": form})
-
-        url = form.cleaned_data["url"]
-
-        tester = AccessibilityTester(url)
-        tester.start_driver()
-        tester.test_page()
-
-        axe = Axe(tester.driver)
-        axe.inject()
-        results = axe.run()
-
-        screenshot = tester.driver.get_screenshot_as_png()
-
-        tester.driver.quit()
-
-        scan = WebsiteScan.objects.create(
-            url=url,
-            user=request.user,
-            doc_language_ok=tester.correct["doc_language"],
-            doc_language_errors=tester.wrong["doc_language"],
-            alt_texts_ok=tester.correct["alt_texts"],
-            alt_texts_errors=tester.wrong["alt_texts"],
-            input_labels_ok=tester.correct["input_labels"],
-            input_labels_errors=tester.wrong["input_labels"],
-            empty_buttons_ok=tester.correct["empty_buttons"],
-            empty_buttons_errors=tester.wrong["empty_buttons"],
-            empty_links_ok=tester.correct["empty_links"],
-            empty_links_errors=tester.wrong["empty_links"],
-            color_contrast_ok=tester.correct["color_contrast"],
-            color_contrast_errors=tester.wrong["color_contrast"],
+            return await sync_to_async(render)(request, "check_form.html", {"form": form})
+
+        profile = (user.is_staff and form.cleaned_data["profile"]) or random.random() < settings.SCAN_PROFILE_SAMPLE_RATE
+        scan = await WebsiteScan.objects.acreate(
+            url=form.cleaned_data["url"], user=user, requested_viewports=form.cleaned_data["viewports"],
+            profile_requested=profile, full_page_requested=form.cleaned_data["full_page"],
         )
-        scan.screenshot.save(f"{uuid4()}.png", ContentFile(screenshot), save=True)
-
-        for v in results["violations"]:
-            for node in v["nodes"]:
-                Violation.objects.create(
-                    scan=scan,
-                    violation_id=v["id"],
-                    impact=v.get("impact"),
-                    description=v["description"],
-                    help_text=v["help"],
-                    help_url=v["helpUrl"],
-                    failure_summary=node.get("failureSummary", ""),
-                    html_snippet=node.get("html", "")
-                )
+        scanner.submit_scan(scan)
 
-        return redirect(f"{reverse('results')}?scan_id={scan.id}")
+        return redirect(f"{reverse('scan_status')}?scan_id={scan.id}")
     else:
         form = URLForm()
 
-    return render(request, "check_form.html", {"form": form})
+    return await sync_to_async(render)(request, "check_form.html", {"form": form})
+
+
+async def _aget_user_scan(request, user) -> WebsiteScan:
+    """This function returns the scan of the scan_id parameter if it belongs to the user, 404 otherwise"""
+    scan_id = request.GET.get("scan_id", "")
+    if not scan_id.isdigit():
+        raise Http404("Invalid scan id")
+    return await aget_object_or_404(WebsiteScan, id=scan_id, user=user)
+
+
+@login_required
+async def scan_status_view(request):
+    user = await request.auser()
+    scan = await _aget_user_scan(request, user)
+    if scan.status == WebsiteScan.Status.DONE:
+        return redirect(f"{reverse('results')}?scan_id={scan.id}")
+
+    return await sync_to_async(render)(request, "scan_status.html", {"scan": scan})
+
+
+async def _scan_events(scan_id: int):
+    last_progress = None
+    while True:
+        progress = scanner.get_progress(scan_id)
+        if progress is None:
+            # the scan is not running in this process, it finished or runs in a scan worker process
+            status, progress = await WebsiteScan.objects.filter(id=scan_id).values_list("status", "progress").aget()
+            if status in (WebsiteScan.Status.DONE, WebsiteScan.Status.FAILED):
+                yield f"event: done\ndata: {json.dumps({'status': status})}\n\n"
+                return
+            if progress is None:
+                progress = {"status": status, "phase": "", "correct": {}, "wrong": {}}
+
+        if progress != last_progress:
+            yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            last_progress = progress
+        else:
+            yield ": keep-alive\n\n"
+
+        await asyncio.sleep(settings.SCAN_PROGRESS_INTERVAL)
+
+
+@login_required
+async def scan_events_view(request):
+    user = await request.auser()
+    scan = await _aget_user_scan(request, user)
+
+    response = StreamingHttpResponse(_scan_events(scan.id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required
 def results_view(request):
     scan_id = request.GET.get("scan_id")
     scan = WebsiteScan.objects.get(id=scan_id)
+    if scan.status != WebsiteScan.Status.DONE:
+        return redirect(f"{reverse('scan_status')}?scan_id={scan.id}")
     violations = scan.violations.all()
 
-    score = AccessibilityTester.calculate_result(
-        {
-            "doc_language": scan.doc_language_ok,
-            "alt_texts": scan.alt_texts_ok,
-            "input_labels": scan.input_labels_ok,
-            "empty_buttons": scan.empty_buttons_ok,
-            "empty_links": scan.empty_links_ok,
-            "color_contrast": scan.color_contrast_ok,
-        },
-        {
-            "doc_language": scan.doc_language_errors,
-            "alt_texts": scan.alt_texts_errors,
-            "input_labels": scan.input_labels_errors,
-            "empty_buttons": scan.empty_buttons_errors,
-            "empty_links": scan.empty_links_errors,
-            "color_contrast": scan.color_contrast_errors,
-        },
-    )
+    # only scans whose fingerprints were made the same way can be compared
+    comparable_scans = WebsiteScan.objects.filter(
+        url=scan.url, user=request.user, status=WebsiteScan.Status.DONE, snippet_fingerprints=scan.snippet_fingerprints,
+    ).exclude(id=scan.id)
+    other_scans = comparable_scans.only("id", "timestamp").order_by("-timestamp")[:50]
+    diff = None
+    if compare_to := request.GET.get("compare_to"):
+        if not compare_to.isdigit():
+            raise Http404("Invalid scan id")
+        other_scan = get_object_or_404(comparable_scans, id=compare_to)
+        # violations are matched by fingerprint in the database, so no violation has to be loaded for the diff itself
+        new_violations = violations.exclude(fingerprint__in=other_scan.violations.values("fingerprint"))
+        fixed_violations = other_scan.violations.exclude(fingerprint__in=violations.values("fingerprint"))
+        diff = {
+            "scan": other_scan,
+            "new_count": new_violations.count(),
+            "fixed_count": fixed_violations.count(),
+            "new": new_violations[:DIFF_DISPLAY_LIMIT],
+            "fixed": fixed_violations[:DIFF_DISPLAY_LIMIT],
+        }
+
+    score = calculate_result(*scan.get_counters())
+    viewports = [
+        (viewport, int(calculate_result(*viewport.get_counters()) * 100))
+        for viewport in scan.viewports.all()
+    ]
 
     return render(request, "results.html", {
         "violations": violations,
         "scan": scan,
         "score": int(score * 100),
+        "viewports": viewports,
+        "other_scans": other_scans,
+        "diff": diff,
     })
 
 